@@ -1,19 +1,32 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException, Header, Request
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Any, Dict
-from supabase import create_client, Client
-from pathlib import Path
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, List, Optional, Any, Dict, Tuple
+from collections import OrderedDict
+from supabase import create_client, Client, ClientOptions
+from pathlib import Path, PurePosixPath
 from dotenv import load_dotenv
+import httpx
 import stripe
 import jwt
 from jwt import PyJWKClient
+import orjson
 import os
 from datetime import datetime
+from functools import lru_cache
+import asyncio
+import base64
+import hashlib
+import json
+import operator
 import re
+import time
+import uuid
 
 
 # =========================================================
@@ -62,8 +75,9 @@ def _warn_if_not_service_role():
         print("WARNING: SUPABASE_SERVICE_KEY is missing")
         return
     try:
-        payload = jwt.decode(SUPABASE_SERVICE_KEY, options={"verify_signature": False})
-        role = payload.get("role")
+        # only the claims segment is needed: base64url-decode it directly
+        claims = SUPABASE_SERVICE_KEY.split(".")[1]
+        role = json.loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4))).get("role")
         if role != "service_role":
             print(f"WARNING: SUPABASE_SERVICE_KEY role is '{role}', expected 'service_role'. RLS will block writes.")
     except Exception as e:
@@ -76,12 +90,34 @@ _warn_if_not_service_role()
 # =========================================================
 # INIT CLIENTS
 # =========================================================
+# One keep-alive pool per worker, shared by every PostgREST/auth call, so warm
+# requests reuse TLS connections instead of paying a handshake.
+supabase_http = httpx.Client(
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=30),
+    timeout=httpx.Timeout(30.0),
+    follow_redirects=True,
+    http2=True,
+)
+
 supabase: Optional[Client] = None
 if SUPABASE_URL and SUPABASE_SERVICE_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    supabase = create_client(
+        SUPABASE_URL,
+        SUPABASE_SERVICE_KEY,
+        options=ClientOptions(httpx_client=supabase_http),
+    )
 else:
     print("WARNING: SUPABASE_URL or SUPABASE_SERVICE_KEY missing. Supabase features will fail.")
 
+
+async def _execute(query):
+    """
+    Runs a supabase-py builder's blocking execute() on the threadpool so the
+    HTTP round-trip does not stall the event loop for every other request.
+    """
+    return await run_in_threadpool(query.execute)
+
+
 if STRIPE_SECRET_KEY:
     stripe.api_key = STRIPE_SECRET_KEY
 else:
@@ -91,7 +127,7 @@ else:
 # =========================================================
 # FASTAPI APP
 # =========================================================
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -104,25 +140,42 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# profile/modules/scan payloads run to several KB of JSON; tiny ones aren't
+# worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
 
 
 # =========================================================
 # MODELS
 # =========================================================
+# Validators/serializers are built at import (not on the first request after a
+# fork), and instances are immutable once validated.
+_MODEL_CONFIG = ConfigDict(defer_build=False, extra="ignore", frozen=True)
+# Request bodies: reject unknown keys instead of silently dropping them
+_INPUT_MODEL_CONFIG = ConfigDict(defer_build=False, extra="forbid", frozen=True)
+
+SurveyRating = Annotated[int, Field(ge=1, le=10)]
+
 class TraumaInput(BaseModel):
-    safety_baseline: int = Field(..., ge=1, le=10)
-    adhd_wiring: int = Field(..., ge=1, le=10)
-    capability: int = Field(..., ge=1, le=10)
-    co_regulation: int = Field(..., ge=1, le=10)
-    financial: int = Field(..., ge=1, le=10)
+    model_config = _INPUT_MODEL_CONFIG
+
+    safety_baseline: SurveyRating
+    adhd_wiring: SurveyRating
+    capability: SurveyRating
+    co_regulation: SurveyRating
+    financial: SurveyRating
 
 class JobScanRequest(BaseModel):
+    model_config = _INPUT_MODEL_CONFIG
+
     job_description: str
     trauma: TraumaInput
     user_id: Optional[str] = None
     consume_credit: bool = True
 
 class VectorScore(BaseModel):
+    model_config = _MODEL_CONFIG
+
     dimension: str
     base_score: float
     trauma_adjusted_score: float
@@ -132,6 +185,8 @@ class VectorScore(BaseModel):
     critical: bool
 
 class JobScanResponse(BaseModel):
+    model_config = _MODEL_CONFIG
+
     overall_score: float
     risk_level: str
     summary: str
@@ -143,20 +198,107 @@ class JobScanResponse(BaseModel):
     credit_cost: int = 1
     preview_mode: bool = False
 
+SCAN_BATCH_MAX_ITEMS = 50
+
+class ScanBatchItem(BaseModel):
+    model_config = _INPUT_MODEL_CONFIG
+
+    job_description: str
+    trauma: TraumaInput
+
+class ScanBatchRequest(BaseModel):
+    model_config = _INPUT_MODEL_CONFIG
+
+    items: List[ScanBatchItem] = Field(..., min_length=1, max_length=SCAN_BATCH_MAX_ITEMS)
+
+class ScanBatchResponse(BaseModel):
+    model_config = _MODEL_CONFIG
+
+    results: List[JobScanResponse]
+
 class StripeCheckoutRequest(BaseModel):
+    model_config = _INPUT_MODEL_CONFIG
+
     credits_to_purchase: int = Field(..., ge=1, le=100)
 
 class TransferModuleRequest(BaseModel):
+    model_config = _INPUT_MODEL_CONFIG
+
     survey: Dict[str, Any]
     job_description: Optional[str] = None
     scan_results: Optional[Dict[str, Any]] = None
     created_at: str
 
 
+# =========================================================
+# IN-PROCESS CACHES (per worker; writers invalidate locally)
+# =========================================================
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+
 # =========================================================
 # CLERK AUTH
 # =========================================================
-jwks_client = PyJWKClient(JWKS_URL)
+# The key set is cached for an hour and refetched on an unknown kid. No
+# cache_keys: PyJWT's per-kid LRU never expires, so it would keep accepting a
+# key Clerk has rotated out.
+jwks_client = PyJWKClient(JWKS_URL, lifespan=3600)
+
+# verified token digest -> sub; an entry never outlives the token's own exp
+_TOKEN_CACHE = TTLCache(maxsize=10_000, ttl=60)
+
+# kid -> the one in-flight key lookup that concurrent requests share.
+# Keys themselves are cached only by jwks_client, so a JWKS refresh (new kid
+# or lifespan expiry) is the single source of truth for rotation.
+_JWKS_INFLIGHT: Dict[Optional[str], "asyncio.Future"] = {}
+
+async def _get_signing_key(token: str):
+    """
+    Signing key for `token`, looked up on the threadpool since a jwks_client
+    miss is a blocking fetch. Concurrent requests for the same kid await one
+    lookup instead of stampeding Clerk.
+    """
+    kid = jwt.get_unverified_header(token).get("kid")
+    inflight = _JWKS_INFLIGHT.get(kid)
+    if inflight is None:
+        inflight = asyncio.ensure_future(run_in_threadpool(jwks_client.get_signing_key_from_jwt, token))
+        _JWKS_INFLIGHT[kid] = inflight
+        inflight.add_done_callback(lambda _: _JWKS_INFLIGHT.pop(kid, None))
+    # shield: one cancelled request must not cancel the lookup for the rest
+    return await asyncio.shield(inflight)
 
 async def get_clerk_user(authorization: Optional[str], rq: Optional[Request]) -> Optional[str]:
     if CLERK_DEV_BYPASS and rq is not None:
@@ -168,23 +310,53 @@ async def get_clerk_user(authorization: Optional[str], rq: Optional[Request]) ->
         return None
 
     token = authorization.replace("Bearer ", "")
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached_sub = _TOKEN_CACHE.get(cache_key)
+    if cached_sub is not None:
+        return cached_sub
+
     try:
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        signing_key = await _get_signing_key(token)
         payload = jwt.decode(
             token,
             signing_key.key,
             algorithms=["RS256"],
-            options={"verify_exp": True},
+            options={"verify_exp": True, "require": ["exp", "sub"]},
         )
-        return payload.get("sub")
+        sub = payload["sub"]
+        _TOKEN_CACHE.set(cache_key, sub, ttl=min(_TOKEN_CACHE.ttl, payload["exp"] - time.time()))
+        return sub
     except Exception as e:
         print("Auth error:", str(e))
         return None
 
 
+async def current_user_id(authorization: Optional[str] = Header(None), rq: Request = None) -> Optional[str]:
+    """Dependency: the caller's Clerk user id, or None for guests."""
+    return await get_clerk_user(authorization, rq)
+
+
 # =========================================================
-# DEBUG
+# HEALTH / DEBUG
 # =========================================================
+# Fixed payloads, encoded once: these are hit by load balancers and the
+# frontend's signed-out state, so skip per-request serialization entirely.
+_HEALTHY = Response(content=b'{"status":"healthy"}', media_type="application/json")
+_WHOAMI_GUEST = Response(content=b'{"user_id":null}', media_type="application/json")
+
+
+@app.get("/health")
+async def health():
+    return _HEALTHY
+
+
+@app.get("/api/debug/whoami")
+async def debug_whoami(user_id: Optional[str] = Depends(current_user_id)):
+    if not user_id:
+        return _WHOAMI_GUEST
+    return {"user_id": user_id}
+
+
 @app.get("/api/debug/env")
 async def debug_env():
     k = NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY
@@ -200,133 +372,240 @@ async def debug_env():
 # =========================================================
 # USERS / CREDITS (Supabase schema: users.user_id (text), credits_remaining (int))
 # =========================================================
-async def ensure_user_row(user_id: str):
+# user_id -> credits_remaining. The frontend polls /api/user/credits on every
+# navigation; our own writes refresh the entry, other writers age out in 5s.
+_CREDITS_CACHE = TTLCache(maxsize=50_000, ttl=5)
+
+SIGNUP_CREDITS = 5
+
+async def ensure_user_row(user_id: str) -> int:
+    """
+    Creates the user's row on first sight and returns their balance. The
+    balance is cached as well.
+    """
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
 
-    resp = supabase.table("users").select("user_id, credits_remaining").eq("user_id", user_id).execute()
-    if resp.data:
-        return
+    # a cached balance means we saw the row within the last few seconds
+    cached = _CREDITS_CACHE.get(user_id)
+    if cached is not None:
+        return cached
 
-    # email is nullable in your live schema
-    supabase.table("users").insert({
-        "user_id": user_id,
-        "credits_remaining": 5,
-        "email": None,
-        "created_at": datetime.utcnow().isoformat(),
-    }).execute()
+    # insert-if-missing + read back in one call (see *_ensure_user.sql)
+    resp = await _execute(supabase.rpc("ensure_user", {"uid": user_id, "signup_credits": SIGNUP_CREDITS}))
+    _store_credits_result(user_id, resp.data)
+    return int(resp.data[0]["credits_remaining"]) if resp.data else 0
 
-async def get_user_credits(user_id: str) -> int:
-    if supabase is None:
-        return 0
-    resp = supabase.table("users").select("credits_remaining").eq("user_id", user_id).execute()
-    if resp.data:
-        return int(resp.data[0].get("credits_remaining", 0))
-    return 0
+def _store_credits_result(user_id: str, rows: List[Dict[str, Any]]):
+    """Refresh the cached balance from a credit RPC's RETURNING row."""
+    if rows:
+        _CREDITS_CACHE.set(user_id, int(rows[0]["credits_remaining"]))
+    else:
+        _CREDITS_CACHE.pop(user_id)
 
 async def deduct_credit(user_id: str) -> bool:
+    """
+    Atomically takes one credit (see supabase/migrations/*_credit_rpcs.sql).
+    The RPC returns no row when the user is missing or already at zero.
+    """
     if supabase is None:
         return False
-    credits = await get_user_credits(user_id)
-    if credits <= 0:
-        return False
-    supabase.table("users").update({"credits_remaining": credits - 1}).eq("user_id", user_id).execute()
-    return True
+    resp = await _execute(supabase.rpc("deduct_credit", {"uid": user_id}))
+    _store_credits_result(user_id, resp.data)
+    return bool(resp.data)
 
 async def add_credits(user_id: str, amount: int):
     if supabase is None:
         return
-    credits = await get_user_credits(user_id)
-    supabase.table("users").update({"credits_remaining": credits + amount}).eq("user_id", user_id).execute()
+    resp = await _execute(supabase.rpc("add_credits", {"uid": user_id, "amount": amount}))
+    _store_credits_result(user_id, resp.data)
+
+
+# =========================================================
+# MODULES (one active module per user)
+# =========================================================
+# user_id -> (encoded {"profile": ...}, etag); dropped whenever this worker
+# writes a module
+_PROFILE_CACHE = TTLCache(maxsize=10_000, ttl=10)
+# user_id -> {(limit, offset): {"modules": [...]}}, one entry per user so a
+# write drops every cached page at once
+_MODULES_CACHE = TTLCache(maxsize=10_000, ttl=10)
+_MODULES_PAGES_PER_USER = 8
+
+def _invalidate_module_caches(user_id: str):
+    _PROFILE_CACHE.pop(user_id)
+    _MODULES_CACHE.pop(user_id)
+
+async def replace_active_module(user_id: str, module: Dict[str, Any]):
+    """
+    Deactivates the user's current module and inserts `module` as the active
+    one in a single transaction (see supabase/migrations/*_module_rpcs.sql).
+    """
+    await _execute(supabase.rpc("replace_active_module", {"uid": user_id, "payload": module}))
+    _invalidate_module_caches(user_id)
+
+async def consume_scan_credit(user_id: str, module: Dict[str, Any]) -> bool:
+    """
+    Takes one credit and swaps in `module` as the active module in one
+    transaction (scan_job_tx). Returns False, writing nothing, when the user
+    has no credits left.
+    """
+    if supabase is None:
+        return False
+    resp = await _execute(supabase.rpc("scan_job_tx", {"uid": user_id, "payload": module}))
+    _store_credits_result(user_id, resp.data)
+    if not resp.data:
+        return False
+    _invalidate_module_caches(user_id)
+    return True
 
 
 # =========================================================
 # SCORING
 # =========================================================
-def calculate_vector_score(job_text: str, trauma: TraumaInput) -> dict:
-    job = (job_text or "").lower()
-    red_flags: List[str] = []
-    green_flags: List[str] = []
-
-    weights = {
-        "Safety Baseline": 0.30,
-        "ADHD Wiring": 0.20,
-        "Capability Fit": 0.25,
-        "Co-Regulation": 0.15,
-        "Financial Security": 0.10
-    }
+_KW_REMOTE_FIRST = 1 << 0
+_KW_ON_SITE = 1 << 1
+_KW_DEEP_WORK = 1 << 2
+_KW_CONTEXT_SWITCHING = 1 << 3
+_KW_STRATEGY = 1 << 4
+_KW_COLLABORATIVE = 1 << 5
+_KW_INDEPENDENT = 1 << 6
+_KW_TEAM = 1 << 7
+_KW_SALARY = 1 << 8
+
+_KEYWORD_FLAGS = {
+    "remote-first": _KW_REMOTE_FIRST,
+    "on-site": _KW_ON_SITE,
+    "relocation": _KW_ON_SITE,
+    "deep work": _KW_DEEP_WORK,
+    "focus time": _KW_DEEP_WORK,
+    "fast-paced": _KW_CONTEXT_SWITCHING,
+    "multitasking": _KW_CONTEXT_SWITCHING,
+    "automation": _KW_STRATEGY,
+    "strategy": _KW_STRATEGY,
+    "collaborative": _KW_COLLABORATIVE,
+    # "team" is a prefix of "team-oriented"; both match at the same offset
+    "team-oriented": _KW_COLLABORATIVE | _KW_TEAM,
+    "independent": _KW_INDEPENDENT,
+    "team": _KW_TEAM,
+    "transparent pay": _KW_SALARY,
+    "salary range": _KW_SALARY,
+}
+
+# Zero-width lookahead so overlapping keywords are all reported in a single
+# left-to-right pass; longest alternatives first so prefixes don't shadow them.
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(_KEYWORD_FLAGS, key=len, reverse=True)) + "))"
+)
 
-    safety_base = 50.0
-    if "remote-first" in job:
-        safety_base += 30 * (11 - trauma.safety_baseline) / 10
-        green_flags.append("Remote-first")
-    if "on-site" in job or "relocation" in job:
-        safety_base -= 40 * (11 - trauma.safety_baseline) / 10
-        red_flags.append("On-site requirement")
-
-    adhd_base = 50.0
-    if "deep work" in job or "focus time" in job:
-        adhd_base += 40 * (11 - trauma.adhd_wiring) / 10
-        green_flags.append("Deep work protected")
-    if "fast-paced" in job or "multitasking" in job:
-        adhd_base -= 30 * (11 - trauma.adhd_wiring) / 10
-        red_flags.append("High context switching")
-
-    capability_base = 50.0
-    if "automation" in job or "strategy" in job:
-        capability_base += 35
-        green_flags.append("Strategic/automation focus")
-
-    coreg_base = 50.0
-    if "collaborative" in job or "team-oriented" in job:
-        coreg_base += 20 * (11 - trauma.co_regulation) / 10
-        green_flags.append("Collaborative culture")
-    if "independent" in job and "team" not in job:
-        coreg_base -= 15 * (11 - trauma.co_regulation) / 10
-        red_flags.append("Potentially isolated")
-
-    financial_base = 50.0
-    if "transparent pay" in job or "salary range" in job:
-        financial_base += 25 * (11 - trauma.financial) / 10
-        green_flags.append("Salary transparency")
-
-    dimensions = {
-        "Safety Baseline": max(0, min(100, safety_base)),
-        "ADHD Wiring": max(0, min(100, adhd_base)),
-        "Capability Fit": max(0, min(100, capability_base)),
-        "Co-Regulation": max(0, min(100, coreg_base)),
-        "Financial Security": max(0, min(100, financial_base))
-    }
 
-    total_score = sum(dimensions[d] * weights[d] for d in dimensions)
+def _keyword_hits(job: str) -> int:
+    """Bitmask of _KW_* flags for every keyword occurring in lowercased job text."""
+    hits = 0
+    for m in _KEYWORD_RE.finditer(job):
+        hits |= _KEYWORD_FLAGS[m.group(1)]
+    return hits
+
+
+# Review UIs rescan the same JD with different trauma inputs; remember the
+# bitmask per raw text. Long texts skip the cache so it stays ~MBs at most.
+_KEYWORD_CACHE_MAX_TEXT = 16_384
+
+@lru_cache(maxsize=1024)
+def _cached_job_keyword_hits(job_text: str) -> int:
+    return _keyword_hits(job_text.lower())
+
+def _job_keyword_hits(job_text: Optional[str]) -> int:
+    if not job_text:
+        return 0
+    if len(job_text) > _KEYWORD_CACHE_MAX_TEXT:
+        return _keyword_hits(job_text.lower())
+    return _cached_job_keyword_hits(job_text)
+
+
+_BASE_SCORE = 50.0
+_DIMENSIONS = ("Safety Baseline", "ADHD Wiring", "Capability Fit", "Co-Regulation", "Financial Security")
+_WEIGHTS = (0.30, 0.20, 0.25, 0.15, 0.10)
+_TRAUMA_FIELDS = ("safety_baseline", "adhd_wiring", "capability", "co_regulation", "financial")
+_trauma_values = operator.attrgetter(*_TRAUMA_FIELDS)
+# (11 - t) / 10 for every valid trauma value t in 1..10 (index 0 unused)
+_TRAUMA_FACTOR = tuple((11 - t) / 10 for t in range(11))
+
+
+def _score_core(hits: int, trauma_vals: Tuple[int, ...]) -> Tuple[List[float], float]:
+    """
+    Pure numeric scoring: keyword bitmask + five trauma ints -> clamped
+    per-dimension scores (in _DIMENSIONS order) and their weighted total.
+    """
+    safety_f, adhd_f, _, coreg_f, financial_f = [_TRAUMA_FACTOR[t] for t in trauma_vals]
+
+    # Branchless: each matched flag is a 0/1 multiplier on its delta.
+    isolated = (hits & (_KW_INDEPENDENT | _KW_TEAM)) == _KW_INDEPENDENT
+    deltas = (
+        30 * safety_f * ((hits & _KW_REMOTE_FIRST) != 0) - 40 * safety_f * ((hits & _KW_ON_SITE) != 0),
+        40 * adhd_f * ((hits & _KW_DEEP_WORK) != 0) - 30 * adhd_f * ((hits & _KW_CONTEXT_SWITCHING) != 0),
+        35.0 * ((hits & _KW_STRATEGY) != 0),
+        20 * coreg_f * ((hits & _KW_COLLABORATIVE) != 0) - 15 * coreg_f * isolated,
+        25 * financial_f * ((hits & _KW_SALARY) != 0),
+    )
+
+    # Every dimension starts at the neutral 50; clamp and weight in one pass.
+    dim_scores = [min(100.0, max(0.0, _BASE_SCORE + d)) for d in deltas]
+    return dim_scores, sum(map(operator.mul, dim_scores, _WEIGHTS))
+
+
+# (mask, required bits under mask, label), in display order
+_GREEN_FLAG_RULES = (
+    (_KW_REMOTE_FIRST, _KW_REMOTE_FIRST, "Remote-first"),
+    (_KW_DEEP_WORK, _KW_DEEP_WORK, "Deep work protected"),
+    (_KW_STRATEGY, _KW_STRATEGY, "Strategic/automation focus"),
+    (_KW_COLLABORATIVE, _KW_COLLABORATIVE, "Collaborative culture"),
+    (_KW_SALARY, _KW_SALARY, "Salary transparency"),
+)
+_RED_FLAG_RULES = (
+    (_KW_ON_SITE, _KW_ON_SITE, "On-site requirement"),
+    (_KW_CONTEXT_SWITCHING, _KW_CONTEXT_SWITCHING, "High context switching"),
+    (_KW_INDEPENDENT | _KW_TEAM, _KW_INDEPENDENT, "Potentially isolated"),
+)
+
+
+def _keyword_flags(hits: int) -> Tuple[List[str], List[str]]:
+    """(green_flags, red_flags) labels for a keyword bitmask."""
+    green_flags = [label for mask, want, label in _GREEN_FLAG_RULES if (hits & mask) == want]
+    red_flags = [label for mask, want, label in _RED_FLAG_RULES if (hits & mask) == want]
+    return green_flags, red_flags
+
+
+def calculate_vector_score(job_text: str, trauma: TraumaInput) -> dict:
+    hits = _job_keyword_hits(job_text)
+    trauma_vals = _trauma_values(trauma)
+    dim_scores, total_score = _score_core(hits, trauma_vals)
+    green_flags, red_flags = _keyword_flags(hits)
+
     risk = "red" if total_score < 50 else "yellow" if total_score < 75 else "green"
     summary = "Safe for your pattern" if risk == "green" else "Proceed with caution" if risk == "yellow" else "Predicted collapse"
 
-    trauma_field_map = {
-        "Safety Baseline": "safety_baseline",
-        "ADHD Wiring": "adhd_wiring",
-        "Capability Fit": "capability",
-        "Co-Regulation": "co_regulation",
-        "Financial Security": "financial",
-    }
-
-    vector_scores: List[VectorScore] = []
+    # plain dicts in VectorScore's shape: they go straight into the stored
+    # module and the orjson response with no model round trip
+    vector_scores: List[Dict[str, Any]] = []
     critical_gaps: List[str] = []
     negotiation_priorities: List[str] = []
 
-    for dim_name, dim_score in dimensions.items():
-        trauma_val = getattr(trauma, trauma_field_map[dim_name])
+    dims = zip(_DIMENSIONS, dim_scores, _WEIGHTS, trauma_vals)
+    for dim_name, dim_score, weight, trauma_val in dims:
         is_critical = dim_score < 50 and trauma_val <= 4
 
-        vector_scores.append(VectorScore(
-            dimension=dim_name,
-            base_score=dim_score,
-            trauma_adjusted_score=dim_score * (11 - trauma_val) / 10,
-            weight=weights[dim_name],
-            match_percentage=round(dim_score, 1),
-            risk_level="Critical" if is_critical else "Caution" if dim_score < 75 else "Safe",
-            critical=is_critical
-        ))
+        vector_scores.append({
+            "dimension": dim_name,
+            "base_score": dim_score,
+            # same operation order as the stored scores have always used;
+            # dim_score * _TRAUMA_FACTOR[t] can round differently in the last ulp
+            "trauma_adjusted_score": dim_score * (11 - trauma_val) / 10,
+            "weight": weight,
+            "match_percentage": round(dim_score, 1),
+            "risk_level": "Critical" if is_critical else "Caution" if dim_score < 75 else "Safe",
+            "critical": is_critical,
+        })
 
         if is_critical:
             critical_gaps.append(f"{dim_name}: {dim_score:.0f}/100")
@@ -351,27 +630,26 @@ def calculate_vector_score(job_text: str, trauma: TraumaInput) -> dict:
 # API ENDPOINTS
 # =========================================================
 @app.post("/api/user/initialize")
-async def initialize_user(authorization: Optional[str] = Header(None), rq: Request = None):
-    user_id = await get_clerk_user(authorization, rq)
+async def initialize_user(user_id: Optional[str] = Depends(current_user_id)):
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    await ensure_user_row(user_id)
-    credits = await get_user_credits(user_id)
+    credits = await ensure_user_row(user_id)
     return {"credits": credits}
 
 
 @app.get("/api/user/credits")
-async def get_credits(authorization: Optional[str] = Header(None), rq: Request = None):
-    user_id = await get_clerk_user(authorization, rq)
+async def get_credits(user_id: Optional[str] = Depends(current_user_id)):
     if not user_id:
         return {"credits": 0, "user_id": None}
-    await ensure_user_row(user_id)
-    credits = await get_user_credits(user_id)
+    credits = await ensure_user_row(user_id)
     return {"credits": credits, "user_id": user_id}
 
 
+_PROFILE_CACHE_CONTROL = "private, no-cache"
+
+
 @app.get("/api/user/profile")
-async def get_user_profile(authorization: Optional[str] = Header(None), rq: Request = None):
+async def get_user_profile(user_id: Optional[str] = Depends(current_user_id), rq: Request = None):
     """
     Returns latest module profile for the user. Includes survey + scan_results.
     This is what the frontend uses after sign-in to restore state.
@@ -379,61 +657,121 @@ async def get_user_profile(authorization: Optional[str] = Header(None), rq: Requ
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
 
-    user_id = await get_clerk_user(authorization, rq)
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
+    cached = _PROFILE_CACHE.get(user_id)
+    if cached is None:
+        cached = await _load_profile(user_id)
+        _PROFILE_CACHE.set(user_id, cached)
+    body, etag = cached
+
+    # per-user data: browsers may keep it but must revalidate every time,
+    # which is a 304 with no body while the profile is unchanged
+    headers = {"ETag": etag, "Cache-Control": _PROFILE_CACHE_CONTROL}
+    if rq is not None and _etag_matches(rq.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _load_profile(user_id: str) -> Tuple[bytes, str]:
     await ensure_user_row(user_id)
 
-    resp = (
+    resp = await _execute(
         supabase.table("modules")
         .select("survey_data, scan_results, created_at, completed_at")
         .eq("user_id", user_id)
         .order("created_at", desc=True)
         .limit(1)
-        .execute()
     )
 
     if not resp.data:
-        return {"profile": None}
+        result = {"profile": None}
+    else:
+        row = resp.data[0]
+        scan = row.get("scan_results") or {}
+        result = {"profile": {"survey": row.get("survey_data") or {}, **scan}}
 
-    row = resp.data[0]
-    scan = row.get("scan_results") or {}
-    profile = {"survey": row.get("survey_data") or {}, **scan}
-    return {"profile": profile}
+    body = orjson.dumps(result)
+    return body, f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+# Listing columns: leaves out job_description, survey_data and metadata,
+# which only the single-module endpoint returns.
+_MODULE_LIST_COLUMNS = "id, scan_results, is_active, created_at, completed_at"
 
 
 @app.get("/api/user/modules")
-async def get_modules(authorization: Optional[str] = Header(None), rq: Request = None):
+async def get_modules(
+    user_id: Optional[str] = Depends(current_user_id),
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    if supabase is None:
+        raise HTTPException(status_code=500, detail="Supabase not configured")
+
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    pages = _MODULES_CACHE.get(user_id)
+    if pages is not None and (limit, offset) in pages:
+        return pages[(limit, offset)]
+
+    resp = await _execute(
+        supabase.table("modules")
+        .select(_MODULE_LIST_COLUMNS)
+        .eq("user_id", user_id)
+        .order("created_at", desc=True)
+        .range(offset, offset + limit - 1)
+    )
+    result = {"modules": resp.data or []}
+
+    if pages is None:
+        pages = {}
+        _MODULES_CACHE.set(user_id, pages)
+    if len(pages) < _MODULES_PAGES_PER_USER:
+        pages[(limit, offset)] = result
+    return result
+
+
+@app.get("/api/user/modules/{module_id}")
+async def get_module(module_id: str, user_id: Optional[str] = Depends(current_user_id)):
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
 
-    user_id = await get_clerk_user(authorization, rq)
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    resp = supabase.table("modules").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-    return {"modules": resp.data or []}
+    # modules.id is a uuid: PostgREST rejects anything else with an error that
+    # maybe_single() reports as a generic failure, so answer it here
+    try:
+        module_id = str(uuid.UUID(module_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Module not found")
+
+    resp = await _execute(supabase.table("modules").select("*").eq("id", module_id).eq("user_id", user_id).maybe_single())
+    if resp is None:
+        raise HTTPException(status_code=404, detail="Module not found")
+    return {"module": resp.data}
 
 
 @app.post("/api/user/retake-survey")
-async def retake_survey(authorization: Optional[str] = Header(None), rq: Request = None):
+async def retake_survey(user_id: Optional[str] = Depends(current_user_id)):
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
 
-    user_id = await get_clerk_user(authorization, rq)
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    supabase.table("modules").update({"is_active": False}).eq("user_id", user_id).eq("is_active", True).execute()
+    await _execute(supabase.table("modules").update({"is_active": False}).eq("user_id", user_id).eq("is_active", True))
+    _invalidate_module_caches(user_id)
     return {"success": True}
 
 
 @app.post("/api/user/transfer-pending-module")
 async def transfer_pending_module(
     body: TransferModuleRequest,
-    authorization: Optional[str] = Header(None),
-    rq: Request = None
+    user_id: Optional[str] = Depends(current_user_id),
 ):
     """
     Used to transfer guest profile/survey into the authenticated user's account.
@@ -441,24 +779,19 @@ async def transfer_pending_module(
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
 
-    user_id = await get_clerk_user(authorization, rq)
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     await ensure_user_row(user_id)
 
-    supabase.table("modules").update({"is_active": False}).eq("user_id", user_id).eq("is_active", True).execute()
-
-    supabase.table("modules").insert({
-        "user_id": user_id,
+    await replace_active_module(user_id, {
         "survey_data": body.survey,
         "job_description": body.job_description or "",
         "scan_results": body.scan_results,
-        "is_active": True,
         "created_at": body.created_at,
         "completed_at": datetime.utcnow().isoformat() if body.scan_results else None,
         "metadata": {"source": "transfer-pending-module"}
-    }).execute()
+    })
 
     return {"success": True}
 
@@ -466,87 +799,157 @@ async def transfer_pending_module(
 @app.post("/api/scan-job", response_model=JobScanResponse)
 async def scan_job_endpoint(
     request: JobScanRequest,
-    authorization: Optional[str] = Header(None),
-    rq: Request = None
+    user_id: Optional[str] = Depends(current_user_id),
 ):
     """
     - If authenticated AND consume_credit=True: deduct 1 credit and save module.
     - Otherwise: preview mode, no credit, no module insertion.
     """
-    user_id = await get_clerk_user(authorization, rq)
     is_preview = (not user_id) or (not request.consume_credit)
 
     if user_id:
         await ensure_user_row(user_id)
 
-    if user_id and request.consume_credit:
-        ok = await deduct_credit(user_id)
-        if not ok:
-            raise HTTPException(status_code=402, detail="No credits remaining")
-
     result = calculate_vector_score(request.job_description, request.trauma)
     result["preview_mode"] = is_preview
 
-    if supabase is not None and user_id and request.consume_credit:
-        supabase.table("modules").update({"is_active": False}).eq("user_id", user_id).eq("is_active", True).execute()
-        dimensional_match = [vs.dict() for vs in result["dimensional_match"]]
+    if user_id and request.consume_credit:
+        now_iso = datetime.utcnow().isoformat()
 
-        supabase.table("modules").insert({
-            "user_id": user_id,
-            "survey_data": request.trauma.dict(),
+        ok = await consume_scan_credit(user_id, {
+            "survey_data": request.trauma.model_dump(),
             "job_description": request.job_description or "",
             "scan_results": {
                 "overall_score": result.get("overall_score"),
                 "risk_level": result.get("risk_level"),
                 "summary": result.get("summary"),
-                "dimensional_match": dimensional_match,
+                "dimensional_match": result["dimensional_match"],
                 "critical_gaps": result.get("critical_gaps", []),
                 "negotiation_priorities": result.get("negotiation_priorities", []),
                 "green_flags": result.get("green_flags", []),
                 "red_flags": result.get("red_flags", []),
             },
-            "is_active": True,
-            "created_at": datetime.utcnow().isoformat(),
-            "completed_at": datetime.utcnow().isoformat(),
+            "created_at": now_iso,
+            "completed_at": now_iso,
             "metadata": {"source": "scan-job"}
-        }).execute()
+        })
+        if not ok:
+            raise HTTPException(status_code=402, detail="No credits remaining")
+
+    # `result` already has JobScanResponse's shape (built entirely by
+    # calculate_vector_score); returning a Response skips FastAPI's
+    # response_model pass, which stays declared for OpenAPI.
+    return ORJSONResponse(result)
 
-    return JobScanResponse(**result)
+
+@app.post("/api/scan-jobs", response_model=ScanBatchResponse)
+async def scan_jobs_endpoint(request: ScanBatchRequest):
+    """
+    Scores up to SCAN_BATCH_MAX_ITEMS job descriptions in one request, in
+    preview mode: no auth, no credits, nothing stored. Results come back in
+    request order.
+    """
+    results = []
+    for item in request.items:
+        result = calculate_vector_score(item.job_description, item.trauma)
+        result["preview_mode"] = True
+        results.append(result)
+    return ORJSONResponse({"results": results})
 
 
 # =========================================================
 # FRONTEND SERVING + KEY INJECTION
 # =========================================================
-@app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
-    frontend_path = BASE_DIR / "frontend" / "index.html"
-    if not frontend_path.exists():
-        raise HTTPException(status_code=500, detail=f"frontend/index.html not found at {frontend_path}")
+_CLERK_KEY_RE = re.compile(rb'data-clerk-publishable-key="[^"]*"')
+_STRIPE_KEY_SENTINEL = b"window.STRIPE_PUBLISHABLE_KEY = 'INJECT_ME';"
+_FRONTEND_CACHE_CONTROL = "public, max-age=60"
+FRONTEND_PATH = BASE_DIR / "frontend" / "index.html"
+
 
-    html_content = frontend_path.read_text(encoding="utf-8")
+def _frontend() -> Tuple[bytes, str]:
+    """(body, etag) for index.html; one stat() per request picks up edits."""
+    try:
+        mtime_ns = FRONTEND_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail=f"frontend/index.html not found at {FRONTEND_PATH}")
+    return _render_frontend(mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _render_frontend(mtime_ns: int) -> Tuple[bytes, str]:
+    """
+    Reads index.html and injects the publishable keys, returning (body, etag).
+    The keys only come from env at import time, so the result is computed once
+    per version of the file. Failures raise and are not cached.
+    """
+    # work on the raw bytes: nothing to decode now or re-encode afterwards
+    html = FRONTEND_PATH.read_bytes()
 
     if not NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY:
         raise HTTPException(status_code=500, detail="NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY is missing on server")
 
-    html_content, n = re.subn(
-        r'data-clerk-publishable-key="[^"]*"',
-        f'data-clerk-publishable-key="{NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY}"',
-        html_content,
+    html, n = _CLERK_KEY_RE.subn(
+        f'data-clerk-publishable-key="{NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY}"'.encode(),
+        html,
         count=1
     )
     if n != 1:
         raise HTTPException(status_code=500, detail="Could not inject Clerk key (attribute not found)")
 
-    html_content = html_content.replace(
-        "window.STRIPE_PUBLISHABLE_KEY = 'INJECT_ME';",
-        f"window.STRIPE_PUBLISHABLE_KEY = '{NEXT_PUBLIC_STRIPE_PUBLISHABLE_KEY}';"
+    body = html.replace(
+        _STRIPE_KEY_SENTINEL,
+        f"window.STRIPE_PUBLISHABLE_KEY = '{NEXT_PUBLIC_STRIPE_PUBLISHABLE_KEY}';".encode()
     )
+    return body, f'W/"{hashlib.sha256(body).hexdigest()}"'
 
-    return HTMLResponse(content=html_content)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison (RFC 9110 13.1.2), as If-None-Match requires. Our ETags
+    are weak anyway: GZipMiddleware may send the same payload gzipped or not.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == opaque for t in if_none_match.split(","))
+
+
+@app.get("/", response_class=HTMLResponse)
+async def serve_frontend(rq: Request = None):
+    body, etag = _frontend()
+    headers = {"ETag": etag, "Cache-Control": _FRONTEND_CACHE_CONTROL}
+    if rq is not None and _etag_matches(rq.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=body, headers=headers)
 
 
 @app.get("/{full_path:path}")
-async def serve_frontend_catch_all(full_path: str):
+async def serve_frontend_catch_all(full_path: str, rq: Request = None):
     if full_path.startswith("api/") or full_path.startswith("webhooks/"):
         raise HTTPException(status_code=404, detail="Not Found")
-    return await serve_frontend()
\ No newline at end of file
+    # SPA routes have no extension; /favicon.ico, /foo.js etc. would
+    # otherwise get index.html back with a 200
+    if PurePosixPath(full_path).suffix:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return await serve_frontend(rq)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop + httptools ship with uvicorn[standard]; pin them explicitly so a
+    # missing extra fails loudly instead of silently falling back to asyncio/h11.
+    # One worker unless WEB_CONCURRENCY says otherwise: the credits/profile/
+    # modules caches are per process and only the writing worker invalidates
+    # its copy, so extra workers can serve a stale balance for a few seconds.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY") or 1),
+        log_level="warning",
+    )
@@ -2,51 +2,9 @@ import asyncio
 import json
 from httpx import ASGITransport, AsyncClient
 import main as app_main
+from tests.fake_supabase import FakeSupabase
 
 # Use in-process fake Supabase
-class InMemoryTable:
-    def __init__(self):
-        self._data = []
-    def update(self, obj):
-        return self
-    def insert(self, obj):
-        self._last_insert = obj
-        self._data.insert(0, obj)
-        class Exec:
-            def __init__(self, data):
-                self.data = [data]
-            def execute(self):
-                return self
-        return Exec(obj)
-    def select(self, *args, **kwargs):
-        outer = self
-        class Exec:
-            def __init__(self):
-                self.data = outer._data
-            def eq(self, *a, **k):
-                return self
-            def order(self, *a, **k):
-                return self
-            def limit(self, *a, **k):
-                return self
-            def execute(self):
-                return self
-        return Exec()
-    def eq(self, *a, **k):
-        return self
-    def execute(self):
-        class R:
-            data = []
-        return R()
-
-class FakeSupabase:
-    def __init__(self):
-        self._tables = {}
-    def table(self, name):
-        if name not in self._tables:
-            self._tables[name] = InMemoryTable()
-        return self._tables[name]
-
 app_main.supabase = FakeSupabase()
 app_main.CLERK_DEV_BYPASS = True
 
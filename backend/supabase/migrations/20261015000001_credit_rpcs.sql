@@ -0,0 +1,32 @@
+-- Atomic credit mutations used by backend/main.py (deduct_credit / add_credits).
+-- Each is a single conditional UPDATE ... RETURNING, so there is no
+-- read-modify-write window between concurrent scans or webhook retries.
+-- Functions return a row set rather than a scalar so supabase-py always
+-- receives a JSON array: one row on success, empty when nothing changed.
+
+create or replace function public.deduct_credit(uid text)
+returns table (credits_remaining integer)
+language sql
+as $$
+  update public.users as u
+     set credits_remaining = u.credits_remaining - 1
+   where u.user_id = uid
+     and u.credits_remaining > 0
+  returning u.credits_remaining;
+$$;
+
+create or replace function public.add_credits(uid text, amount integer)
+returns table (credits_remaining integer)
+language sql
+as $$
+  update public.users as u
+     set credits_remaining = u.credits_remaining + amount
+   where u.user_id = uid
+  returning u.credits_remaining;
+$$;
+
+-- Only the backend (service role) may move credits.
+revoke execute on function public.deduct_credit(text) from public, anon, authenticated;
+revoke execute on function public.add_credits(text, integer) from public, anon, authenticated;
+grant execute on function public.deduct_credit(text) to service_role;
+grant execute on function public.add_credits(text, integer) to service_role;
@@ -0,0 +1,31 @@
+-- Swap a user's active module in one transaction, used by
+-- replace_active_module() in backend/main.py. Replaces the separate
+-- "UPDATE ... SET is_active = false" + "INSERT" round trips, and readers
+-- never observe a moment with zero active modules.
+--
+-- `payload` carries the module columns as JSON (survey_data, job_description,
+-- scan_results, created_at, completed_at, metadata); jsonb_populate_record
+-- casts each key to the column's own type.
+
+create or replace function public.replace_active_module(uid text, payload jsonb)
+returns setof public.modules
+language plpgsql
+as $$
+begin
+  update public.modules
+     set is_active = false
+   where user_id = uid
+     and is_active;
+
+  return query
+  insert into public.modules
+    (user_id, survey_data, job_description, scan_results, is_active, created_at, completed_at, metadata)
+  select uid, r.survey_data, coalesce(r.job_description, ''), r.scan_results, true,
+         r.created_at, r.completed_at, r.metadata
+    from jsonb_populate_record(null::public.modules, payload) as r
+  returning *;
+end;
+$$;
+
+revoke execute on function public.replace_active_module(text, jsonb) from public, anon, authenticated;
+grant execute on function public.replace_active_module(text, jsonb) to service_role;
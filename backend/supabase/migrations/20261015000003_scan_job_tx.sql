@@ -0,0 +1,32 @@
+-- Paid scan write path in one round trip, used by consume_scan_credit() in
+-- backend/main.py: take one credit and, only if that succeeded, swap in the
+-- new active module -- all in the same transaction.
+-- Returns the new balance as a single row, or no row (and writes nothing)
+-- when the user is missing or out of credits.
+
+create or replace function public.scan_job_tx(uid text, payload jsonb)
+returns table (credits_remaining integer)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  remaining integer;
+begin
+  update public.users as u
+     set credits_remaining = u.credits_remaining - 1
+   where u.user_id = uid
+     and u.credits_remaining > 0
+  returning u.credits_remaining into remaining;
+
+  if not found then
+    return;
+  end if;
+
+  perform 1 from public.replace_active_module(uid, payload);
+
+  return query select remaining;
+end;
+$$;
+
+revoke execute on function public.scan_job_tx(text, jsonb) from public, anon, authenticated;
+grant execute on function public.scan_job_tx(text, jsonb) to service_role;
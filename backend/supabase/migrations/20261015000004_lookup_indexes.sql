@@ -0,0 +1,9 @@
+-- Every authenticated request looks a user up by user_id; make that an
+-- index probe (and guarantee the one row maybe_single() expects).
+create unique index if not exists users_user_id_uidx
+  on public.users (user_id);
+
+-- replace_active_module / scan_job_tx deactivate the user's active module.
+create index if not exists modules_user_active_idx
+  on public.modules (user_id)
+  where is_active;
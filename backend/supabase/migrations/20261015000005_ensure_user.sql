@@ -0,0 +1,24 @@
+-- First-sight user creation in one round trip, used by ensure_user_row() in
+-- backend/main.py. Replaces the SELECT-then-INSERT pair; ON CONFLICT makes
+-- concurrent first requests for the same user safe. Relies on the unique
+-- index on users(user_id).
+-- Returns the user's balance (existing, or the freshly granted
+-- signup_credits) as a single row.
+
+create or replace function public.ensure_user(uid text, signup_credits integer)
+returns table (credits_remaining integer)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  insert into public.users (user_id, credits_remaining, email, created_at)
+  values (uid, signup_credits, null, now())
+  on conflict (user_id) do nothing;
+
+  return query
+    select u.credits_remaining from public.users as u where u.user_id = uid;
+end;
+$$;
+
+revoke execute on function public.ensure_user(text, integer) from public, anon, authenticated;
+grant execute on function public.ensure_user(text, integer) to service_role;
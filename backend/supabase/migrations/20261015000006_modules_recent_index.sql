@@ -0,0 +1,9 @@
+-- /api/user/profile and /api/user/modules both filter modules by user_id
+-- and order by created_at desc; this turns that filter + sort into an index
+-- range scan that stops after the requested rows.
+--
+-- No INCLUDE of survey_data / scan_results: they are unbounded jsonb, and an
+-- index tuple over ~2.7kB makes the INSERT fail. The active-module partial
+-- index already exists (20261015000004_lookup_indexes.sql).
+create index if not exists modules_user_created_idx
+  on public.modules (user_id, created_at desc);
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import httpx
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport
+
+# Ensure backend package path is importable when running tests from repo root
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import main as app_main
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client():
+    """One in-process client for the whole run; the app keeps no per-client state."""
+    async with httpx.AsyncClient(transport=ASGITransport(app=app_main.app), base_url="http://test") as c:
+        yield c
+
+
+@pytest.fixture
+def as_user():
+    """Authenticate every request in the test as the given user id (None = guest)."""
+    def _apply(user_id):
+        app_main.app.dependency_overrides[app_main.current_user_id] = lambda: user_id
+    yield _apply
+    app_main.app.dependency_overrides.pop(app_main.current_user_id, None)
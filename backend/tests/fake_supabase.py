@@ -0,0 +1,155 @@
+"""
+In-memory stand-in for the supabase-py client, covering the calls main.py
+makes: table().select/insert/update with eq/order/limit/range/maybe_single,
+and the Postgres functions in supabase/migrations via rpc().
+
+Rows are kept newest-first in a deque (O(1) insert) and indexed by user_id,
+so `.eq("user_id", ...)` lookups don't scan the whole table.
+"""
+from collections import defaultdict, deque
+
+
+class FakeResponse:
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class FakeQuery:
+    __slots__ = ("_table", "_columns", "_values", "_filters", "_order", "_window", "_single")
+
+    def __init__(self, table, columns="*", values=None):
+        self._table = table
+        self._columns = columns
+        self._values = values
+        self._filters = {}
+        self._order = None
+        self._window = None
+        self._single = False
+
+    def eq(self, column, value):
+        self._filters[column] = value
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._window = (0, n)
+        return self
+
+    def range(self, start, end):
+        self._window = (start, end - start + 1)
+        return self
+
+    def maybe_single(self):
+        self._single = True
+        return self
+
+    def _matching(self):
+        uid = self._filters.get("user_id")
+        rows = self._table.rows if uid is None else self._table.by_user.get(uid, ())
+        return [r for r in rows if all(r.get(k) == v for k, v in self._filters.items())]
+
+    def execute(self):
+        if self._values is not None:
+            rows = self._matching()
+            for row in rows:
+                row.update(self._values)
+            return FakeResponse(rows)
+
+        rows = self._matching()
+        if self._order:
+            column, desc = self._order
+            rows.sort(key=lambda r: r.get(column) or "", reverse=desc)
+        if self._window:
+            start, count = self._window
+            rows = rows[start:start + count]
+        if self._columns.strip() != "*":
+            wanted = [c.strip() for c in self._columns.split(",")]
+            rows = [{c: r[c] for c in wanted if c in r} for r in rows]
+
+        if self._single:
+            # PostgREST gives back the lone row as an object, or nothing at all
+            return FakeResponse(rows[0]) if rows else None
+        return FakeResponse(rows)
+
+
+# FakeTable and FakeSupabase keep a __dict__ on purpose: tests spy on them by
+# monkeypatching instance attributes (select, rpc), and _last_insert must stay
+# absent until the first insert.
+class FakeTable:
+    def __init__(self):
+        self.rows = deque()
+        self.by_user = defaultdict(deque)
+
+    def select(self, columns="*"):
+        return FakeQuery(self, columns)
+
+    def update(self, values):
+        return FakeQuery(self, values=values)
+
+    def insert(self, row):
+        row = dict(row)
+        self._last_insert = row
+        self.rows.appendleft(row)
+        if "user_id" in row:
+            self.by_user[row["user_id"]].appendleft(row)
+        return FakeResponse([row])
+
+    def find_user(self, uid):
+        found = self.by_user.get(uid)
+        return found[0] if found else None
+
+
+class FakeSupabase:
+    def __init__(self):
+        self._tables = {}
+
+    def table(self, name):
+        if name not in self._tables:
+            self._tables[name] = FakeTable()
+        return self._tables[name]
+
+    def rpc(self, name, params):
+        return FakeResponse(getattr(self, f"_rpc_{name}")(**params))
+
+    # -- supabase/migrations emulation ----------------------------------
+
+    def _rpc_ensure_user(self, uid, signup_credits):
+        users = self.table("users")
+        row = users.find_user(uid)
+        if row is None:
+            row = users.insert({"user_id": uid, "credits_remaining": signup_credits, "email": None}).data[0]
+        return [{"credits_remaining": row["credits_remaining"]}]
+
+    def _rpc_deduct_credit(self, uid):
+        row = self.table("users").find_user(uid)
+        if row is None or row["credits_remaining"] <= 0:
+            return []
+        row["credits_remaining"] -= 1
+        return [{"credits_remaining": row["credits_remaining"]}]
+
+    def _rpc_add_credits(self, uid, amount):
+        row = self.table("users").find_user(uid)
+        if row is None:
+            return []
+        row["credits_remaining"] += amount
+        return [{"credits_remaining": row["credits_remaining"]}]
+
+    def _rpc_replace_active_module(self, uid, payload):
+        modules = self.table("modules")
+        for row in modules.by_user.get(uid, ()):
+            row["is_active"] = False
+        return modules.insert({**payload, "user_id": uid, "is_active": True}).data
+
+    def _rpc_scan_job_tx(self, uid, payload):
+        remaining = self._rpc_deduct_credit(uid)
+        if remaining:
+            self._rpc_replace_active_module(uid, payload)
+        return remaining
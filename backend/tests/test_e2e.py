@@ -1,12 +1,13 @@
 import asyncio
+import io
 import json
 import os
 import sys
+import time
+import urllib.request
 import pytest
 from datetime import datetime
-import httpx
-from httpx import ASGITransport
-from fastapi import FastAPI
+from unittest.mock import Mock
 
 # Ensure backend package path is importable when running tests from repo root
 ROOT = os.path.dirname(os.path.dirname(__file__))
@@ -14,70 +15,20 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 import main as app_main
-
-# Tests will create an AsyncClient with ASGI transport per-test
-ASGI_TRANSPORT = ASGITransport(app=app_main.app)
-
-
-def make_dummy_table():
-    class Dummy:
-        def __init__(self):
-            self._data = []
-        def update(self, obj):
-            return self
-        def insert(self, obj):
-            # capture insert payload for assertions if needed
-            self._last_insert = obj
-            # persist into table data so select() can return it
-            self._data.insert(0, obj)
-            class Exec:
-                def __init__(self, data):
-                    self.data = [data]
-                def execute(self):
-                    return self
-            return Exec(obj)
-        def select(self, *args, **kwargs):
-            outer = self
-            class Exec:
-                def __init__(self):
-                    # return the table data (most recent first)
-                    self.data = outer._data
-                def eq(self, *a, **k):
-                    return self
-                def order(self, *a, **k):
-                    return self
-                def limit(self, *a, **k):
-                    return self
-                def execute(self):
-                    return self
-            return Exec()
-        def eq(self, *a, **k):
-            return self
-        def execute(self):
-            class R:
-                data = []
-            return R()
-
-    return Dummy()
+from tests.fake_supabase import FakeSupabase
 
 
 @pytest.fixture(autouse=True)
 def patch_supabase(monkeypatch):
-    # Patch supabase.table to avoid external calls
-    # Provide stable table instances per table name so tests can inspect inserts
-    class FakeSupabase:
-        def __init__(self):
-            self._tables = {}
-        def table(self, name):
-            if name not in self._tables:
-                self._tables[name] = make_dummy_table()
-            return self._tables[name]
-
+    # Patch supabase to avoid external calls; tables persist for the test so
+    # assertions can inspect rows and the last insert
     monkeypatch.setattr(app_main, "supabase", FakeSupabase())
+    app_main._CREDITS_CACHE.clear()
+    app_main._PROFILE_CACHE.clear()
+    app_main._MODULES_CACHE.clear()
 
 
-@pytest.mark.asyncio
-async def test_scan_preview_guest():
+async def test_scan_preview_guest(client):
     payload = {
         "job_description": "Remote-first deep work protected role",
         "trauma": {
@@ -90,26 +41,16 @@ async def test_scan_preview_guest():
         "consume_credit": False
     }
 
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        r = await client.post("/api/scan-job", json=payload)
-        assert r.status_code == 200
-        data = r.json()
-        assert data["preview_mode"] is True
-        assert "overall_score" in data
-
-
-@pytest.mark.asyncio
-async def test_authenticated_scan_creates_module_and_initialize(monkeypatch):
-    # Patch get_clerk_user to simulate an authenticated user
-    async def fake_get_clerk_user(*args, **kwargs):
-        return "test-user-123"
+    r = await client.post("/api/scan-job", json=payload)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["preview_mode"] is True
+    assert "overall_score" in data
 
-    monkeypatch.setattr(app_main, "get_clerk_user", fake_get_clerk_user)
 
-    # Patch deduct_credit to always return True
-    async def fake_deduct_credit(uid):
-        return True
-    monkeypatch.setattr(app_main, "deduct_credit", fake_deduct_credit)
+async def test_authenticated_scan_creates_module_and_initialize(client, as_user):
+    # as_user overrides the current_user_id dependency for this test
+    as_user("test-user-123")
 
     payload = {
         "job_description": "Remote-first deep work protected role",
@@ -123,27 +64,49 @@ async def test_authenticated_scan_creates_module_and_initialize(monkeypatch):
         "consume_credit": True
     }
 
-    # Make the request with an Authorization header (value ignored by fake_get_clerk_user)
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        r = await client.post("/api/scan-job", json=payload, headers={"Authorization": "Bearer fake"})
-        assert r.status_code == 200
-        data = r.json()
-        assert data["preview_mode"] is False
-        assert "overall_score" in data
+    # the header only mirrors a real client; as_user decides who the caller is
+    r = await client.post("/api/scan-job", json=payload, headers={"Authorization": "Bearer fake"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["preview_mode"] is False
+    assert "overall_score" in data
 
+    # Credit and module were written together by scan_job_tx
+    assert app_main.supabase.table("users").rows[0]["credits_remaining"] == 4
+    module = app_main.supabase.table("modules")._last_insert
+    assert module["user_id"] == "test-user-123"
+    assert module["scan_results"]["overall_score"] == data["overall_score"]
 
-@pytest.mark.asyncio
-async def test_initialize_user_grants_credits(monkeypatch):
-    async def fake_get_clerk_user(authorization=None):
-        return "init-user-1"
 
-    monkeypatch.setattr(app_main, "get_clerk_user", fake_get_clerk_user)
+async def test_scan_without_credits_writes_nothing(client, as_user):
+    as_user("broke-user-1")
+    app_main.supabase.table("users").insert({"user_id": "broke-user-1", "credits_remaining": 0})
+
+    payload = {
+        "job_description": "Remote-first role",
+        "trauma": {
+            "safety_baseline": 5,
+            "adhd_wiring": 5,
+            "capability": 5,
+            "co_regulation": 5,
+            "financial": 5
+        },
+        "consume_credit": True
+    }
 
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        r = await client.post("/api/user/initialize", headers={"Authorization": "Bearer fake"})
-        assert r.status_code == 200
-        data = r.json()
-        assert data.get("credits") == 5
+    r = await client.post("/api/scan-job", json=payload, headers={"Authorization": "Bearer fake"})
+    assert r.status_code == 402
+
+    assert not hasattr(app_main.supabase.table("modules"), "_last_insert")
+
+
+async def test_initialize_user_grants_credits(client, as_user):
+    as_user("init-user-1")
+
+    r = await client.post("/api/user/initialize", headers={"Authorization": "Bearer fake"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data.get("credits") == 5
 
     # Verify a user record was inserted with 5 credits
     users_table = app_main.supabase.table("users")
@@ -152,12 +115,8 @@ async def test_initialize_user_grants_credits(monkeypatch):
     assert users_table._last_insert["credits_remaining"] == 5
 
 
-@pytest.mark.asyncio
-async def test_transfer_and_profile_visible(monkeypatch):
-    async def fake_get_clerk_user(*args, **kwargs):
-        return "transfer-user-1"
-
-    monkeypatch.setattr(app_main, "get_clerk_user", fake_get_clerk_user)
+async def test_transfer_and_profile_visible(client, as_user):
+    as_user("transfer-user-1")
 
     payload = {
         "survey": {"safety_baseline": 6},
@@ -166,77 +125,398 @@ async def test_transfer_and_profile_visible(monkeypatch):
         "created_at": datetime.utcnow().isoformat()
     }
 
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        r = await client.post("/api/user/transfer-pending-module", json=payload, headers={"Authorization": "Bearer fake"})
-        assert r.status_code == 200
-        assert r.json().get("success") is True
+    r = await client.post("/api/user/transfer-pending-module", json=payload, headers={"Authorization": "Bearer fake"})
+    assert r.status_code == 200
+    assert r.json().get("success") is True
 
-        # Now fetch profile
-        r2 = await client.get("/api/user/profile", headers={"Authorization": "Bearer fake"})
-        assert r2.status_code == 200
-        profile = r2.json().get("profile")
-        assert profile is not None
-        assert profile.get("overall_score") == 88.5
+    # Now fetch profile
+    r2 = await client.get("/api/user/profile", headers={"Authorization": "Bearer fake"})
+    assert r2.status_code == 200
+    profile = r2.json().get("profile")
+    assert profile is not None
+    assert profile.get("overall_score") == 88.5
 
     modules_table = app_main.supabase.table("modules")
     assert hasattr(modules_table, "_last_insert")
     assert modules_table._last_insert["user_id"] == "transfer-user-1"
 
 
-@pytest.mark.asyncio
-async def test_debug_whoami_endpoint(monkeypatch):
+async def test_debug_whoami_endpoint(client, as_user):
     # No auth header -> should return user_id null
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        r = await client.get("/api/debug/whoami")
-        assert r.status_code == 200
-        assert r.json().get("user_id") is None
+    r = await client.get("/api/debug/whoami")
+    assert r.status_code == 200
+    assert r.json().get("user_id") is None
+
+    # With an authenticated user, should return id
+    as_user("whoami-user")
+
+    r = await client.get("/api/debug/whoami", headers={"Authorization": "Bearer fake"})
+    assert r.status_code == 200
+    assert r.json().get("user_id") == "whoami-user"
 
-    # With auth (monkeypatch get_clerk_user), should return id
-    async def fake_get_clerk(*args, **kwargs):
-        return "whoami-user"
-    monkeypatch.setattr(app_main, "get_clerk_user", fake_get_clerk)
 
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        r = await client.get("/api/debug/whoami", headers={"Authorization": "Bearer fake"})
-        assert r.status_code == 200
-        assert r.json().get("user_id") == "whoami-user"
+async def test_health(client):
+    r = await client.get("/health")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    assert r.json() == {"status": "healthy"}
 
 
-@pytest.mark.asyncio
-async def test_dev_bypass_header(monkeypatch):
+async def test_dev_bypass_header(client, monkeypatch):
     # Enable dev bypass and call with X-DEV-USER header
     monkeypatch.setattr(app_main, "CLERK_DEV_BYPASS", True)
 
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        r = await client.get("/api/debug/whoami", headers={"X-DEV-USER": "dev-user-1"})
-        assert r.status_code == 200
-        assert r.json().get("user_id") == "dev-user-1"
+    r = await client.get("/api/debug/whoami", headers={"X-DEV-USER": "dev-user-1"})
+    assert r.status_code == 200
+    assert r.json().get("user_id") == "dev-user-1"
 
 
-@pytest.mark.asyncio
-async def test_dev_signup_flow(monkeypatch):
+async def test_dev_signup_flow(client, monkeypatch):
     # Use CLERK_DEV_BYPASS and the X-DEV-USER header to simulate a sign-up flow
     monkeypatch.setattr(app_main, "CLERK_DEV_BYPASS", True)
 
-    async with httpx.AsyncClient(transport=ASGI_TRANSPORT, base_url="http://test") as client:
-        # Step 1: initialize user via dev-bypass header
-        r = await client.post("/api/user/initialize", headers={"X-DEV-USER": "devflow-user-1"})
-        assert r.status_code == 200
-        assert r.json().get("credits") == 5
-
-        # Step 2: transfer a pending guest module
-        payload = {
-            "survey": {"safety_baseline": 6},
-            "job_description": "Remote-first role",
-            "scan_results": {"overall_score": 88.5},
-            "created_at": datetime.utcnow().isoformat()
-        }
-        r2 = await client.post("/api/user/transfer-pending-module", headers={"X-DEV-USER": "devflow-user-1"}, json=payload)
-        assert r2.status_code == 200
-
-        # Step 3: fetch profile — should be visible
-        r3 = await client.get("/api/user/profile", headers={"X-DEV-USER": "devflow-user-1"})
-        assert r3.status_code == 200
-        profile = r3.json().get("profile")
-        assert profile is not None
-        assert profile.get("overall_score") == 88.5
+    # Step 1: initialize user via dev-bypass header
+    r = await client.post("/api/user/initialize", headers={"X-DEV-USER": "devflow-user-1"})
+    assert r.status_code == 200
+    assert r.json().get("credits") == 5
+
+    # Step 2: transfer a pending guest module
+    payload = {
+        "survey": {"safety_baseline": 6},
+        "job_description": "Remote-first role",
+        "scan_results": {"overall_score": 88.5},
+        "created_at": datetime.utcnow().isoformat()
+    }
+    r2 = await client.post("/api/user/transfer-pending-module", headers={"X-DEV-USER": "devflow-user-1"}, json=payload)
+    assert r2.status_code == 200
+
+    # Step 3: fetch profile — should be visible
+    r3 = await client.get("/api/user/profile", headers={"X-DEV-USER": "devflow-user-1"})
+    assert r3.status_code == 200
+    profile = r3.json().get("profile")
+    assert profile is not None
+    assert profile.get("overall_score") == 88.5
+
+
+async def test_clerk_token_verification_is_cached(monkeypatch):
+    fetched, decoded = [], []
+
+    class FakeJWKS:
+        def get_signing_key_from_jwt(self, token):
+            fetched.append(token)
+            class Key:
+                key = "fake-key"
+            return Key()
+
+    def fake_decode(token, *a, **k):
+        decoded.append(token)
+        return {"sub": "cached-user", "exp": time.time() + 300}
+
+    monkeypatch.setattr(app_main, "jwks_client", FakeJWKS())
+    monkeypatch.setattr(app_main.jwt, "decode", fake_decode)
+    app_main._TOKEN_CACHE.clear()
+
+    token_abc = app_main.jwt.encode({"n": "abc"}, "s" * 32, algorithm="HS256", headers={"kid": "k1"})
+    token_def = app_main.jwt.encode({"n": "def"}, "s" * 32, algorithm="HS256", headers={"kid": "k1"})
+
+    for _ in range(3):
+        assert await app_main.get_clerk_user(f"Bearer {token_abc}", None) == "cached-user"
+    assert decoded == [token_abc]
+
+    # A different token is verified on its own; its key comes from
+    # jwks_client, the only key cache
+    assert await app_main.get_clerk_user(f"Bearer {token_def}", None) == "cached-user"
+    assert decoded == [token_abc, token_def]
+    assert fetched == [token_abc, token_def]
+
+
+async def test_concurrent_jwks_misses_share_one_fetch(monkeypatch):
+    fetched = []
+
+    class SlowJWKS:
+        def get_signing_key_from_jwt(self, token):
+            fetched.append(token)
+            time.sleep(0.05)
+            return "key-k2"
+
+    monkeypatch.setattr(app_main, "jwks_client", SlowJWKS())
+
+    token = app_main.jwt.encode({}, "s" * 32, algorithm="HS256", headers={"kid": "k2"})
+    keys = await asyncio.gather(*(app_main._get_signing_key(token) for _ in range(5)))
+
+    assert keys == ["key-k2"] * 5
+    assert len(fetched) == 1
+    assert not app_main._JWKS_INFLIGHT
+
+
+async def test_rotated_signing_key_stops_verifying(monkeypatch):
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jwt.algorithms import RSAAlgorithm
+    from jwt.jwk_set_cache import JWKSetCache
+
+    old_key, new_key = (rsa.generate_private_key(public_exponent=65537, key_size=2048) for _ in range(2))
+
+    def jwk(private_key, kid):
+        return {**json.loads(RSAAlgorithm.to_jwk(private_key.public_key())), "kid": kid, "alg": "RS256"}
+
+    def token(private_key, kid, sub):
+        claims = {"sub": sub, "exp": time.time() + 300}
+        return app_main.jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+    published = {"keys": [jwk(old_key, "old")]}
+    monkeypatch.setattr(
+        urllib.request.OpenerDirector, "open",
+        lambda self, req, timeout=None: io.BytesIO(json.dumps(published).encode()),
+    )
+    # fresh key set for this test, and no refresh cooldown between fetches
+    monkeypatch.setattr(app_main.jwks_client, "jwk_set_cache", JWKSetCache(3600))
+    monkeypatch.setattr(app_main.jwks_client, "cooldown_duration", 0)
+    app_main._TOKEN_CACHE.clear()
+
+    assert await app_main.get_clerk_user(f"Bearer {token(old_key, 'old', 'u1')}", None) == "u1"
+
+    # Clerk rotates: the unknown kid refreshes the set, and the retired key
+    # must not keep verifying from some other cache
+    published["keys"] = [jwk(new_key, "new")]
+    assert await app_main.get_clerk_user(f"Bearer {token(new_key, 'new', 'u2')}", None) == "u2"
+    assert await app_main.get_clerk_user(f"Bearer {token(old_key, 'old', 'u3')}", None) is None
+
+
+def test_keyword_hits_match_substring_semantics():
+    samples = [
+        "Remote-first team-oriented strategy role",
+        "independent contributor, fast-paced, relocation required",
+        "Independent work with deep work blocks and a salary range posted",
+        "automation-site independenteam",
+        "",
+    ]
+    for text in samples:
+        job = text.lower()
+        expected = 0
+        for keyword, flag in app_main._KEYWORD_FLAGS.items():
+            if keyword in job:
+                expected |= flag
+        assert app_main._keyword_hits(job) == expected, text
+        assert app_main._job_keyword_hits(text) == expected, text
+
+
+async def test_frontend_rendered_once_with_injected_keys(client, monkeypatch):
+    monkeypatch.setattr(app_main, "NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY", "pk_test_injected")
+    monkeypatch.setattr(app_main, "NEXT_PUBLIC_STRIPE_PUBLISHABLE_KEY", "pk_stripe_injected")
+    app_main._render_frontend.cache_clear()
+
+    reads = []
+    real_read_bytes = app_main.Path.read_bytes
+
+    def counting_read_bytes(self, *args, **kwargs):
+        reads.append(self.name)
+        return real_read_bytes(self, *args, **kwargs)
+
+    monkeypatch.setattr(app_main.Path, "read_bytes", counting_read_bytes)
+
+    r = await client.get("/")
+    r2 = await client.get("/results")
+
+    app_main._render_frontend.cache_clear()
+
+    assert r.status_code == 200
+    assert r2.text == r.text
+    assert 'data-clerk-publishable-key="pk_test_injected"' in r.text
+    assert "window.STRIPE_PUBLISHABLE_KEY = 'pk_stripe_injected';" in r.text
+    assert reads == ["index.html"]
+
+
+async def test_deduct_credit_uses_atomic_rpc():
+    users_table = app_main.supabase.table("users")
+    users_table.insert({"user_id": "rpc-user-1", "credits_remaining": 1})
+
+    assert await app_main.deduct_credit("rpc-user-1") is True
+    assert await app_main.deduct_credit("rpc-user-1") is False
+    assert await app_main.deduct_credit("missing-user") is False
+
+    await app_main.add_credits("rpc-user-1", 3)
+    assert users_table.rows[0]["credits_remaining"] == 3
+
+
+async def test_credit_cache_refreshed_by_rpc_writes():
+    users_table = app_main.supabase.table("users")
+    users_table.insert({"user_id": "cache-user-1", "credits_remaining": 2})
+    assert await app_main.ensure_user_row("cache-user-1") == 2
+
+    # Out-of-band change is not visible until our own write refreshes the entry
+    users_table.rows[0]["credits_remaining"] = 9
+    assert await app_main.ensure_user_row("cache-user-1") == 2
+
+    assert await app_main.deduct_credit("cache-user-1") is True
+    assert await app_main.ensure_user_row("cache-user-1") == 8
+
+
+async def test_frontend_revalidates_with_etag(client, monkeypatch):
+    monkeypatch.setattr(app_main, "NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY", "pk_test_etag")
+    app_main._render_frontend.cache_clear()
+
+    r = await client.get("/")
+    etag = r.headers["etag"]
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "public, max-age=60"
+
+    r2 = await client.get("/survey", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+
+    r3 = await client.get("/", headers={"If-None-Match": '"stale"'})
+    assert r3.status_code == 200
+
+    app_main._render_frontend.cache_clear()
+
+
+async def test_profile_revalidates_with_etag(client, as_user):
+    as_user("etag-user-1")
+    auth = {"Authorization": "Bearer fake"}
+    app_main.supabase.table("modules").insert({
+        "user_id": "etag-user-1",
+        "survey_data": {"safety_baseline": 6},
+        "scan_results": {"overall_score": 61.0, "summary": "x" * 1000},
+        "created_at": "2026-01-01T00:00:00",
+    })
+
+    r = await client.get("/api/user/profile", headers={**auth, "Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "private, no-cache"
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.json()["profile"]["overall_score"] == 61.0
+
+    # weak: the body may go out gzipped or not under the same tag
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+
+    r2 = await client.get("/api/user/profile", headers={**auth, "If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+
+    # If-None-Match uses weak comparison, so the bare opaque tag matches too
+    r2 = await client.get("/api/user/profile", headers={**auth, "If-None-Match": etag.removeprefix("W/")})
+    assert r2.status_code == 304
+
+    # a new module changes the profile and so the etag
+    payload = {"survey": {}, "job_description": "j", "scan_results": {"overall_score": 62.0},
+               "created_at": "2026-01-02T00:00:00"}
+    await client.post("/api/user/transfer-pending-module", json=payload, headers=auth)
+    r3 = await client.get("/api/user/profile", headers={**auth, "If-None-Match": r.headers["etag"]})
+    assert r3.status_code == 200
+    assert r3.json()["profile"]["overall_score"] == 62.0
+
+
+async def test_modules_listing_is_paginated(client, as_user):
+    as_user("modules-user-1")
+    module_id = "6f1c1d0e-2b7a-4a39-9a55-2c8c4e1f0a01"
+    app_main.supabase.table("modules").insert({"id": module_id, "user_id": "modules-user-1", "scan_results": {"overall_score": 70.0}})
+
+    r = await client.get("/api/user/modules?limit=10&offset=0", headers={"Authorization": "Bearer fake"})
+    assert r.status_code == 200
+    assert r.json()["modules"][0]["scan_results"]["overall_score"] == 70.0
+
+    r2 = await client.get("/api/user/modules?limit=500", headers={"Authorization": "Bearer fake"})
+    assert r2.status_code == 422
+
+    r3 = await client.get(f"/api/user/modules/{module_id}", headers={"Authorization": "Bearer fake"})
+    assert r3.status_code == 200
+    assert r3.json()["module"]["id"] == module_id
+
+    # a malformed id never reaches PostgREST (which would fail on the cast)
+    r4 = await client.get("/api/user/modules/not-a-uuid", headers={"Authorization": "Bearer fake"})
+    assert r4.status_code == 404
+
+
+async def test_credits_endpoint_reads_user_row_once(client, monkeypatch, as_user):
+    as_user("poll-user-1")
+    users_table = app_main.supabase.table("users")
+    users_table.insert({"user_id": "poll-user-1", "credits_remaining": 3})
+
+    select = Mock(wraps=users_table.select)
+    rpc = Mock(wraps=app_main.supabase.rpc)
+    monkeypatch.setattr(users_table, "select", select)
+    monkeypatch.setattr(app_main.supabase, "rpc", rpc)
+
+    for _ in range(3):
+        r = await client.get("/api/user/credits", headers={"Authorization": "Bearer fake"})
+        assert r.json() == {"credits": 3, "user_id": "poll-user-1"}
+
+    rpc.assert_called_once_with("ensure_user", {"uid": "poll-user-1", "signup_credits": 5})
+    select.assert_not_called()
+
+
+async def test_frontend_rerendered_when_file_changes(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_main, "NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY", "pk_test_injected")
+    page = tmp_path / "index.html"
+    page.write_text('<html data-clerk-publishable-key="">v1</html>', encoding="utf-8")
+    os.utime(page, ns=(1, 1))
+    monkeypatch.setattr(app_main, "FRONTEND_PATH", page)
+    app_main._render_frontend.cache_clear()
+
+    r = await client.get("/")
+    page.write_text('<html data-clerk-publishable-key="">v2</html>', encoding="utf-8")
+    os.utime(page, ns=(2, 2))
+    r2 = await client.get("/")
+
+    app_main._render_frontend.cache_clear()
+
+    assert "v1" in r.text
+    assert "v2" in r2.text
+    assert r.headers["etag"] != r2.headers["etag"]
+
+
+async def test_modules_listing_cached_until_module_write(client, as_user):
+    as_user("modules-user-2")
+    modules_table = app_main.supabase.table("modules")
+    modules_table.insert({"id": "m1", "user_id": "modules-user-2", "scan_results": {"overall_score": 70.0}})
+
+    r = await client.get("/api/user/modules", headers={"Authorization": "Bearer fake"})
+    assert len(r.json()["modules"]) == 1
+
+    # an out-of-band row stays invisible until this worker writes a module
+    modules_table.insert({"id": "m2", "user_id": "modules-user-2", "scan_results": {"overall_score": 80.0}})
+    r2 = await client.get("/api/user/modules", headers={"Authorization": "Bearer fake"})
+    assert len(r2.json()["modules"]) == 1
+
+    await client.post("/api/user/retake-survey", headers={"Authorization": "Bearer fake"})
+    r3 = await client.get("/api/user/modules", headers={"Authorization": "Bearer fake"})
+    assert len(r3.json()["modules"]) == 2
+
+
+async def test_catch_all_404s_for_missing_files(client, monkeypatch):
+    monkeypatch.setattr(app_main, "NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY", "pk_test_injected")
+
+    assert (await client.get("/favicon.ico")).status_code == 404
+    assert (await client.get("/assets/app.js")).status_code == 404
+    assert (await client.get("/results")).status_code == 200
+
+    app_main._render_frontend.cache_clear()
+
+
+async def test_scan_jobs_batch_matches_single_previews(client):
+    trauma = {"safety_baseline": 3, "adhd_wiring": 2, "capability": 5, "co_regulation": 4, "financial": 1}
+    jobs = ["Remote-first deep work role", "On-site, fast-paced, independent", ""]
+
+    r = await client.post("/api/scan-jobs", json={"items": [{"job_description": j, "trauma": trauma} for j in jobs]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert len(results) == 3
+
+    for job, batched in zip(jobs, results):
+        single = await client.post("/api/scan-job", json={"job_description": job, "trauma": trauma, "consume_credit": False})
+        assert batched == single.json()
+
+    too_many = [{"job_description": "x", "trauma": trauma}] * (app_main.SCAN_BATCH_MAX_ITEMS + 1)
+    assert (await client.post("/api/scan-jobs", json={"items": too_many})).status_code == 422
+    assert (await client.post("/api/scan-jobs", json={"items": []})).status_code == 422
+
+
+async def test_scan_rejects_unknown_and_out_of_range_inputs(client):
+    trauma = {"safety_baseline": 3, "adhd_wiring": 2, "capability": 5, "co_regulation": 4, "financial": 1}
+
+    r = await client.post("/api/scan-job", json={"job_description": "x", "trauma": {**trauma, "mood": 3}, "consume_credit": False})
+    assert r.status_code == 422
+
+    r2 = await client.post("/api/scan-job", json={"job_description": "x", "trauma": {**trauma, "financial": 11}, "consume_credit": False})
+    assert r2.status_code == 422
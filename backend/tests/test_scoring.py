@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import main as app_main
+
+# Outputs of the original calculate_vector_score, recorded for every
+# combination of the nine scoring keywords against a spread of trauma inputs.
+# Scoring rewrites must reproduce them exactly, float for float.
+GOLDEN = json.loads((Path(__file__).parent / "golden_scores.json").read_text())
+RISK_LEVELS = {"r": "red", "y": "yellow", "g": "green"}
+
+
+def _job_text(mask, keywords):
+    return "Role: " + ", ".join(k for i, k in enumerate(keywords) if mask >> i & 1)
+
+
+def _expected(mask, trauma_idx):
+    """Expected response, assembled from the per-dimension and overall tables."""
+    dimensional_match, critical_gaps, negotiation_priorities = [], [], []
+    green_flags, red_flags = [], []
+    for dim, t in zip(GOLDEN["dimensions"], GOLDEN["trauma"][trauma_idx]):
+        # this dimension's keywords, as a bitmask over its own keyword list
+        sub = sum(1 << j for j, k in enumerate(dim["keywords"]) if mask >> k & 1)
+        row = dim["rows"][str(sub)]
+        base, adjusted, match, risk, gap, priority = row["by_trauma"][t - 1]
+        dimensional_match.append({
+            "dimension": dim["dimension"],
+            "base_score": base,
+            "trauma_adjusted_score": adjusted,
+            "weight": dim["weight"],
+            "match_percentage": match,
+            "risk_level": risk,
+            "critical": gap is not None,
+        })
+        critical_gaps += [gap] if gap else []
+        negotiation_priorities += [priority] if priority else []
+        green_flags += row["green_flags"]
+        red_flags += row["red_flags"]
+
+    risk_level = RISK_LEVELS[GOLDEN["risk_level"][mask][trauma_idx]]
+    return {
+        "overall_score": GOLDEN["overall_score"][mask][trauma_idx],
+        "risk_level": risk_level,
+        "summary": GOLDEN["summaries"][risk_level],
+        "dimensional_match": dimensional_match,
+        "critical_gaps": critical_gaps,
+        "negotiation_priorities": negotiation_priorities,
+        "red_flags": red_flags,
+        "green_flags": green_flags,
+        "credit_cost": 1,
+        "preview_mode": False,
+    }
+
+
+@pytest.mark.parametrize("keywords", ["keywords", "alt_keywords"])
+def test_scores_match_golden(keywords):
+    mismatches = []
+    for trauma_idx, trauma_vals in enumerate(GOLDEN["trauma"]):
+        trauma = app_main.TraumaInput(**dict(zip(app_main._TRAUMA_FIELDS, trauma_vals)))
+        for mask in range(1 << len(GOLDEN[keywords])):
+            got = app_main.calculate_vector_score(_job_text(mask, GOLDEN[keywords]), trauma)
+            if got != _expected(mask, trauma_idx):
+                mismatches.append((mask, trauma_vals))
+
+    assert not mismatches, f"{len(mismatches)} inputs drifted from the golden scores, e.g. {mismatches[:5]}"